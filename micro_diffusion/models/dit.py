@@ -2,13 +2,14 @@ from typing import List
 # this works only if DaVinci is set in pythonpath
 # dont do .modules
 from micro_diffusion.models.modules import CaptionProjection, CrossAttention, MLP, MLPConfig, SelfAttention, T2IFinalLayer, TimeStepEmbedder
-from micro_diffusion.models.modules import create_norm, get_2d_sincos_pos_embed, get_mask, mask_out_token, modulate, fill_out_masked_tokens
+from micro_diffusion.models.modules import create_norm, get_2d_sincos_pos_embed, get_mask, mask_out_token, modulated_layernorm, fill_out_masked_tokens
 from micro_diffusion.models.modules import MLPConfig
 
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 
+import math
 import numpy as np
 from timm.models.vision_transformer import PatchEmbed
 
@@ -60,19 +61,26 @@ class FeedForwardNetwork(nn.Module):
     def __init__(self, n_embd, n_hidden, hidden_base_mult, use_bias):
         super().__init__()
         
-        self.n_hidden = int (2*n_hidden/3)
-        self.n_hidden = hidden_base_mult * ((n_hidden + hidden_base_mult - 1) // hidden_base_mult)
-        self.fc1 = nn.Linear (n_embd, self.n_hidden, bias=use_bias)
-        self.fc2 = nn.Linear (n_embd, self.n_hidden, bias=use_bias)
+        # SwiGLU has 3 weight matrices instead of 2, scale n_hidden by 2/3 to keep parameter count in check
+        n_hidden = int (2*n_hidden/3)
+        # round up to a multiple of 16 as well, so that fp16/bf16 GEMMs get tensor core dispatch
+        align = math.lcm (hidden_base_mult, 16)
+        self.n_hidden = align * ((n_hidden + align - 1) // align)
+        assert self.n_hidden % 16 == 0, f"n_hidden:{self.n_hidden} should be a multiple of 16"
+        # gate (silu branch) and up projections stacked into one linear along fan_out, one GEMM instead of two on the same x
+        # first n_hidden rows are gate, last n_hidden rows are up
+        self.w_gate_up = nn.Linear (n_embd, 2*self.n_hidden, bias=use_bias)
         self.fc3 = nn.Linear(self.n_hidden, n_embd, bias=use_bias)
 
     def forward (self, x):
-        return self.fc3 (F.silu(self.fc1(x)) * self.fc2(x))
-    
+        gate, up = self.w_gate_up(x).chunk(2, dim=-1) # 2x (B, T, n_hidden)
+        # silu and mul get fused into a single elementwise kernel by inductor when training with misc.compile
+        return self.fc3 (F.silu(gate) * up)
+
     def custom_init (self, init_std:float):
-        nn.init.trunc_normal_(self.fc1.weight, mean=0.0, std=0.02)
-        for linear in (self.fc2, self.fc3):
-            nn.init.trunc_normal_(linear.weight, mean=0.0, std=init_std)
+        nn.init.trunc_normal_(self.w_gate_up.weight[:self.n_hidden], mean=0.0, std=0.02)
+        nn.init.trunc_normal_(self.w_gate_up.weight[self.n_hidden:], mean=0.0, std=init_std)
+        nn.init.trunc_normal_(self.fc3.weight, mean=0.0, std=init_std)
     
 class FeedForwardECMoe (nn.Module):
     """Expert Choice style Mixture of Experts feed forward layer with GELU activation
@@ -94,17 +102,23 @@ class FeedForwardECMoe (nn.Module):
         
         self.n_embd = n_embd
         self.hidden_base_mult = hidden_base_mult
-        self.n_hidden = hidden_base_mult * ((n_hidden + hidden_base_mult -1) // hidden_base_mult)
+        # round up to a multiple of 16 as well, so that fp16/bf16 GEMMs get tensor core dispatch
+        align = math.lcm (hidden_base_mult, 16)
+        self.n_hidden = align * ((n_hidden + align - 1) // align)
+        assert self.n_hidden % 16 == 0, f"n_hidden:{self.n_hidden} should be a multiple of 16"
 
         # to get softmax over num_experts for T tokens
         self.gate = nn.Linear (n_embd, num_experts, bias=False) # bias false makes sense in case model wants to 1 hot on experts
 
         # each expert goes from n_embd to n_hidden
-        self.w1 = nn.Parameter (torch.ones (num_experts, n_embd, n_hidden))
+        self.w1 = nn.Parameter (torch.empty (num_experts, n_embd, self.n_hidden))
         # non linear activation
         self.gelu = nn.GELU()
         # each expert goes from n_hidden to n_embd
-        self.w2 = nn.Parameter (torch.ones (num_experts, n_hidden, n_embd))
+        self.w2 = nn.Parameter (torch.empty (num_experts, self.n_hidden, n_embd))
+        # expert weights are allocated uninitialized, initialize right away so they are never used as garbage
+        # DiTBlock.custom_init re-initializes w2 with depth aware std
+        self.custom_init(init_std=0.02)
     
     def forward (self, x:torch.Tensor):
         # extract shapes
@@ -116,31 +130,36 @@ class FeedForwardECMoe (nn.Module):
 
         # get scores, softmax for each token over experts, how appealing is an expert to each of the T tokens
         scores = self.gate (x) # (B, T, E) E is number of experts
-        probs = F.softmax (scores, dim=-1) # probs for T tokens across experts
+        probs = F.softmax (scores, dim=-1) # probs for T tokens across experts, reduces over contiguous last dim
 
-        probs_expert_looking_at_all_tokens = probs.permute(0, 2, 1) # (B, E, T)
+        # one copy of the small (B, E, T) probs tensor, so that topk along T runs over contiguous rows
+        probs_expert_looking_at_all_tokens = probs.transpose(1, 2).contiguous() # (B, E, T)
 
         # gather top-tokens-per-expert
         # probs, idices
         expert_specific_token_probs, expert_specific_tokens = torch.topk (probs_expert_looking_at_all_tokens, tokens_per_expert, dim=-1)
         # (B, E, l)       (B, E, l) l is tokens per expert
-        # create one hot vectors of T size for the selected tokens, so that we can extract from B,T,C
-        # to construct xin for moe
-        extract_from_x_one_hot = F.one_hot(expert_specific_tokens, num_classes=T).float() # (B, E, l, T)
+        # flatten batch and tokens so that each token of each image has a unique row in (B*T, C)
+        # lay the selected rows out expert major (E, B, l), so that tokens of an expert are contiguous for bmm
+        token_index = expert_specific_tokens + T * torch.arange (B, device=x.device).view(B, 1, 1) # (B, E, l)
+        token_index = token_index.permute(1, 0, 2).reshape(-1) # (E*B*l)
 
-        # Goal: (B, E, l C) from x
-        xin = torch.einsum ('BElT, BTC -> BElC', extract_from_x_one_hot, x)
-        
-        # forward
-        activation = torch.einsum ('BElC, ECH -> BElH', xin, self.w1) # (B, E, l, H)
+        # Goal: (E, B*l, C) from x
+        xin = x.reshape(B*T, C).index_select(0, token_index).view(self.num_experts, -1, C) # (E, B*l, C)
+
+        # forward, batched GEMM over experts
+        activation = torch.bmm (xin, self.w1) # (E, B*l, H)
         activation = self.gelu(activation)
-        activation = torch.einsum ('BElH, EHC -> BElC', activation, self.w2) # (B, E, l, C)
+        activation = torch.bmm (activation, self.w2) # (E, B*l, C)
 
         # scale the activation with gating score probs, so that stronger experts have greater influence on the outputs
-        activation = activation * expert_specific_token_probs.unsqueeze(dim=-1)
+        activation = activation * expert_specific_token_probs.permute(1, 0, 2).reshape(self.num_experts, -1, 1) # (E, B*l, 1)
 
-        # use inner product to combine results of T tokens from all the different experts
-        out = torch.einsum ('BElC, BElT -> BTC', activation, extract_from_x_one_hot)
+        # add results back to the T token slots, tokens picked by several experts accumulate their contributions
+        # tokens that no expert picked stay 0
+        out = activation.new_zeros (B*T, C)
+        out.index_add_ (0, token_index, activation.view(-1, C))
+        out = out.view(B, T, C) # (B, T, C)
         return out
     
     def custom_init (self, init_std:float):
@@ -158,7 +177,6 @@ class DiTBlock (nn.Module):
         mlp_n_hidden_mult (float):  Multiplier for feed-forward network hidden dimension w.r.t input dimension
         qkv_n_hidden_mult (float): Multiplier for dimension in qkv layers in attention block
         hidden_base_mult (int): Round hidden dimension upto next nearest multiple of this value
-        modulated_sigma_t_embd (int): Dimension of pooled caption embeddings
         norm_eps (float): Epsilon for layer normalization
         
         Setting this flag true, respects depth of blocks and initalizes projection layer weights with respect to block
@@ -183,7 +201,6 @@ class DiTBlock (nn.Module):
             mlp_n_hidden_mult:float,
             qkv_n_hidden_mult:float,
             hidden_base_mult:int,
-            modulated_sigma_t_embd:int,
             norm_eps:float,
             depth_init:bool,
             block_index:int,
@@ -202,9 +219,10 @@ class DiTBlock (nn.Module):
         if qkv_n_hidden_mult == 1:
             qkv_n_hidden = n_embd
         else:
-            # round qkv_n_hidden up to be next nearest multiple of 2*head_size
+            # round qkv_n_hidden up to be next nearest multiple of 2*head_size (and of 16 for tensor core dispatch)
             # qkv_n_hidden % headsize = 0
-            qkv_n_hidden = 2*head_size* (( int (qkv_n_hidden_mult *n_embd) + (2*head_size) - 1) // (2*head_size))
+            align = math.lcm (2*head_size, 16)
+            qkv_n_hidden = align * (( int (qkv_n_hidden_mult *n_embd) + align - 1) // align)
         
 
         self.ln1 = create_norm ("layernorm", n_embd, eps=norm_eps)
@@ -215,7 +233,8 @@ class DiTBlock (nn.Module):
         # cross attention TODO: check if its done against time(noise) or caption embeddings
         # TODO: cross attention (IF run on CAPTIONS has to have 0 contribution (use_bias=False) when caption set to 0 for CFG)
         cx_attn_n_hidden = qkv_n_hidden if scale_cx_attn_n_hidden else n_embd
-        self.cx_attn = CrossAttention (n_embd=n_embd, n_head=cx_attn_n_hidden//head_size, n_hidden=cx_attn_n_hidden, norm_eps=norm_eps, qkv_bias=use_bias)
+        # kv projection of caption is done by DiT for all blocks at once, block receives its kv slice in forward
+        self.cx_attn = CrossAttention (n_embd=n_embd, n_head=cx_attn_n_hidden//head_size, n_hidden=cx_attn_n_hidden, norm_eps=norm_eps, qkv_bias=use_bias, project_kv=False)
 
         self.ln3 = create_norm ("layernorm", dim=n_embd, eps=norm_eps)
 
@@ -227,11 +246,6 @@ class DiTBlock (nn.Module):
             FeedForwardNetwork (n_embd=n_embd, n_hidden=mlp_n_hidden, hidden_base_mult=hidden_base_mult, use_bias=use_bias)
         )
 
-        self.AdaLN_modulation = nn.Sequential (
-            nn.GELU(approximate="tanh"),
-            nn.Linear (modulated_sigma_t_embd, 6*n_embd)
-        )
-
         # Equivalent to NANO_GPT_SCALE_INIT for projecting layers
         # std dev from which projection layers weights are to be initated
         # we hard code rest of the layers as 0.02
@@ -242,19 +256,21 @@ class DiTBlock (nn.Module):
 
     #change name of args after setting up initial aggregation
     # x is forward information stream
-    # c is aggregated caption and time to certain abstraction
-    # TODO: introspect later t is lets just say time (B, C) for now
+    # kv is this block's (B, L, 2C') slice of cross attention kv projection of caption c, computed once for all blocks in DiT
+    # (c is aggregated caption and time to certain abstraction)
+    # modulation is this block's (B, 6C) slice of AdaLN projection of modulated_sigma_t, computed once for all blocks in DiT
 
-    def forward(self, x:torch.Tensor, c:torch.Tensor, t:torch.Tensor):
+    def forward(self, x:torch.Tensor, kv:torch.Tensor, modulation:torch.Tensor):
         # extract 3 gamma, 3 beta from pooled caption embd?
         # each has shape (B, C)
-        shift_msa, scale_msa, gate_msa, shift_mlp, scale_mlp, gate_mlp =self.AdaLN_modulation (t).split (self.n_embd, dim=-1) # split along 6c so we get 6 splits
+        shift_msa, scale_msa, gate_msa, shift_mlp, scale_mlp, gate_mlp = modulation.split (self.n_embd, dim=-1) # split along 6c so we get 6 splits
         # x (B, T, C) after modulation with scale (B, [1],C) and shift (B, [1], C) //[1] unsqueezed
         # the shape of x is still (B, T, C) it needs to be gated with (B, [1], C) so that the shape will still be (B, T, C)
         # B, T, C = B, 1, C * B, T, C
-        x = x + gate_msa.unsqueeze(1) * self.attn(modulate( self.ln1(x), shift=shift_msa, scale=scale_msa))
-        x = x + self.cx_attn (self.ln2(x), c) # caption condition c already has extracted information from timestep at presetup
-        x = x + gate_mlp.unsqueeze(1)*self.mlp(modulate(self.ln3(x), shift=shift_mlp, scale=scale_mlp)) # (B, T, C)
+        # addcmul does gate * branch + residual in one fused kernel instead of a broadcast mul followed by an add
+        x = torch.addcmul (x, gate_msa.unsqueeze(1), self.attn(modulated_layernorm(x, self.ln1, shift=shift_msa, scale=scale_msa)))
+        x = x + self.cx_attn (self.ln2(x), kv=kv) # caption condition c already has extracted information from timestep at presetup
+        x = torch.addcmul (x, gate_mlp.unsqueeze(1), self.mlp(modulated_layernorm(x, self.ln3, shift=shift_mlp, scale=scale_mlp))) # (B, T, C)
 
         return x # (B, T, C)
     
@@ -343,7 +359,15 @@ class DiT(nn.Module):
 
         # calculate base size to feed into position embedding function
         self.base_size = input_res // self.patch_size
-        self.register_buffer("pos_embed", torch.zeros(1, num_patches, n_embd))
+        # fixed 2D sincos position embeddings, built once here and moved/cast along with the model by .to()
+        # deterministic from config, so kept out of state_dict (persistent=False)
+        pos_embed = get_2d_sincos_pos_embed (
+            n_embd,
+            int(num_patches**0.5), # grid size 16x16 with current setting
+            pos_interp_scale=self.pos_interp_scale,
+            base_size=self.base_size
+        )
+        self.register_buffer("pos_embed", pos_embed.unsqueeze(0), persistent=False) # (1, HW=256, n_embd)
 
         # non linearity in config if nn.GELU(tanh) by default
         caption_embedder_config = MLPConfig (fan_in=caption_n_embd, fan_h=n_embd, fan_out=n_embd, norm_layer=create_norm("layernorm", n_embd, eps=norm_eps))
@@ -378,7 +402,6 @@ class DiT(nn.Module):
                     mlp_n_hidden_mult=patch_mixer_mlp_dim_mult,
                     qkv_n_hidden_mult=patch_mixer_qkv_dim_mult,
                     hidden_base_mult=n_hidden_base_mult, # for MLP, attention layers always have 2*head_size base mult
-                    modulated_sigma_t_embd=n_embd, # sigma_t_modulated_embd projected into 6x patch_mixer_dim for gate,shift,scale each of patch_mixer_dim
                     norm_eps=norm_eps,
                     depth_init=depth_init,
                     block_index=i, # doesnt affect weight init (intended to count prior inclusive residual additions), since depth_init is false for patch_mixer
@@ -402,7 +425,6 @@ class DiT(nn.Module):
                         mlp_n_hidden_mult=patch_mixer_mlp_dim_mult,
                         qkv_n_hidden_mult=patch_mixer_qkv_dim_mult,
                         hidden_base_mult=n_hidden_base_mult, # for MLP, attention layers always have 2*head_size base mult
-                        modulated_sigma_t_embd=n_embd,
                         norm_eps=norm_eps,
                         depth_init=depth_init,
                         block_index=i+depth+patch_mixer_depth, # doesnt affect weight init (intended to count prior inclusive residual additions), since depth_init is false for patch_mixer
@@ -485,7 +507,6 @@ class DiT(nn.Module):
                 mlp_n_hidden_mult=mlp_fan_h_mults[i],
                 qkv_n_hidden_mult= qkv_fan_h_mults[i],
                 hidden_base_mult=n_hidden_base_mult, # used only for MLP FFN, attention layers always use basemult of 2xHead_Size
-                modulated_sigma_t_embd=n_embd, # modulated_sigma_t embd to get scale shift gate for attn and mlp (each shape n_embd)
                 norm_eps=norm_eps,
                 depth_init=depth_init,
                 block_index=i + patch_mixer_depth,
@@ -498,6 +519,25 @@ class DiT(nn.Module):
             )for i in range(depth)
         ])
 
+        # AdaLN modulation for all DiT blocks (patch_mixer, backbone, patch_demixer in that order)
+        # every block conditions on the same modulated_sigma_t, so instead of one tiny GELU + linear per block
+        # project it once into 6 x block n_embd for every block (shift, scale, gate for attn and mlp) and split per block
+        self.AdaLN_split_sizes = [6 * block.n_embd for block in self.dit_blocks()]
+        self.AdaLN_modulation = nn.Sequential (
+            nn.GELU(approximate="tanh"),
+            nn.Linear (n_embd, sum(self.AdaLN_split_sizes))
+        )
+
+        # cross attention kv projections of caption for all DiT blocks, caption doesnt change from block to block
+        # so project it once with one linear per caption embd (fan_out = sum of 2 x cx_attn n_hidden) and split per block
+        # patch_mixer and patch_demixer attend to caption projected to patch_mixer_dim, backbone attends to caption
+        if self.use_patch_mixer:
+            mixer_blocks = list(self.patch_mixer) + (list(self.patch_demixer) if self.auto_mask_decoder else [])
+            self.patch_mixer_cx_attn_kv_split_sizes = [2 * block.cx_attn.n_hidden for block in mixer_blocks]
+            self.patch_mixer_cx_attn_kv = nn.Linear (patch_mixer_dim, sum(self.patch_mixer_cx_attn_kv_split_sizes), bias=use_bias)
+        self.backbone_cx_attn_kv_split_sizes = [2 * block.cx_attn.n_hidden for block in self.backbone]
+        self.backbone_cx_attn_kv = nn.Linear (n_embd, sum(self.backbone_cx_attn_kv_split_sizes), bias=use_bias)
+
         self.register_buffer ("mask_token", torch.zeros(1, 1, patch_size**2 *self.out_channels))
         #self.register_buffer ("mask_token", torch.zeros(1, 1, patch_mixer_dim))
 
@@ -537,7 +577,7 @@ class DiT(nn.Module):
         self.h = H // self.patch_size # 32/2 = 16
         self.W = W // self.patch_size # 32/2 = 16
 
-        # self.pos_embed is initialized during weight_init 
+        # self.pos_embed is built at init 
         x = self.x_embedder(x) + self.pos_embed  # (B, 256, 1152) + (1, 256, 1152) (pos_embed is a register_buffer) 
         
         # sigma_t noise tensor expanded across entire batch -> (B)
@@ -559,14 +599,27 @@ class DiT(nn.Module):
         # modulated noise level and caption information
         modulated_sigma_t = sigma_t + pooled_caption
 
-        
+        # AdaLN modulation for all DiT blocks in one go, (B, 6 x block n_embd) for each block
+        modulations = self.AdaLN_modulation (modulated_sigma_t).split (self.AdaLN_split_sizes, dim=-1)
+        num_mixer_blocks = len(self.patch_mixer) if self.use_patch_mixer else 0
+        num_backbone_blocks = len(self.backbone)
+        mixer_modulations = modulations[:num_mixer_blocks]
+        backbone_modulations = modulations[num_mixer_blocks:num_mixer_blocks + num_backbone_blocks]
+        demixer_modulations = modulations[num_mixer_blocks + num_backbone_blocks:]
+
+        # cross attention kv for all backbone blocks in one go, (B, L, 2C') for each block
+        backbone_kvs = self.backbone_cx_attn_kv (c).split (self.backbone_cx_attn_kv_split_sizes, dim=-1)
+
         if self.use_patch_mixer:
             x = self.project_image_to_patch_mixer_embd(x)
             c_mixer = self.project_caption_to_patch_mixer_embd(c) # (B, L, patch_mixer_dim)
+            # cross attention kv for all patch_mixer (and patch_demixer) blocks in one go
+            mixer_kvs = self.patch_mixer_cx_attn_kv (c_mixer).split (self.patch_mixer_cx_attn_kv_split_sizes, dim=-1)
+            demixer_kvs = mixer_kvs[num_mixer_blocks:]
             # no need to project modulated_sigma_t to patch_mixer_embd since we just get affine parameters of appropriate embd 
             # from it using a adaln layer.
-            for block in self.patch_mixer:
-                x = block (x, c_mixer, modulated_sigma_t) # (B, T, patch_mixer_embd)
+            for block, kv, modulation in zip(self.patch_mixer, mixer_kvs, mixer_modulations):
+                x = block (x, kv, modulation) # (B, T, patch_mixer_embd)
         
         mask = None
         if mask_ratio > 0:
@@ -584,8 +637,8 @@ class DiT(nn.Module):
             # after masking out, to save compute
             x = self.project_image_patch_mixer_to_backbone_embd (x)
         
-        for block in self.backbone:
-            x = block(x=x, c=c, t=modulated_sigma_t) # (B, 0.25T, C)
+        for block, kv, modulation in zip(self.backbone, backbone_kvs, backbone_modulations):
+            x = block(x=x, kv=kv, modulation=modulation) # (B, 0.25T, C)
 
         # project to demixer
         if self.auto_mask_decoder:
@@ -593,8 +646,8 @@ class DiT(nn.Module):
 
         # Run patch demixer
         if self.auto_mask_decoder:
-            for block in self.patch_demixer:
-                x= block (x=x, c=c_mixer, t=modulated_sigma_t) 
+            for block, kv, modulation in zip(self.patch_demixer, demixer_kvs, demixer_modulations):
+                x= block (x=x, kv=kv, modulation=modulation) 
         
         x = self.final_layer (x, modulated_sigma_t) # (B, 0.25T, patch_size**2 C) # project back to out.channels
 
@@ -607,6 +660,16 @@ class DiT(nn.Module):
         
 
     
+    def dit_blocks (self)->List[DiTBlock]:
+        """DiT blocks in order of execution: patch_mixer, backbone, patch_demixer"""
+        blocks = []
+        if self.use_patch_mixer:
+            blocks.extend(self.patch_mixer)
+        blocks.extend(self.backbone)
+        if self.use_patch_mixer and self.auto_mask_decoder:
+            blocks.extend(self.patch_demixer)
+        return blocks
+
     def unpatchify (self, x:torch.Tensor)->torch.Tensor:
         # x (B, 0.25T, C=4*2*2)
         B = x.shape[0]
@@ -675,14 +738,6 @@ class DiT(nn.Module):
         # init model parameters
         self.apply(_basic_init)
 
-        pos_embed = get_2d_sincos_pos_embed (
-            self.pos_embed.shape[-1],
-            int(self.x_embedder.num_patches**0.5), # grid size 16x16 with current setting
-            pos_interp_scale=self.pos_interp_scale,
-            base_size=self.base_size
-        )
-        self.pos_embed.data.copy_(torch.from_numpy(pos_embed).float().unsqueeze(0)) # (1, HW=256, n_embd)
-
         w = self.x_embedder.proj.weight.data
         nn.init.xavier_uniform_(w.view([w.shape[0],-1]))
 
@@ -699,12 +754,13 @@ class DiT(nn.Module):
         for block in self.patch_mixer:
             block.custom_init()
 
-        for block in self.backbone:
-            nn.init.constant_(block.AdaLN_modulation[-1].weight, 0) # initally set weights of linear layer in AdaLN module to 0,
-            # so that it doesnt contribute to activations in atypical initial setting
+        nn.init.constant_(self.AdaLN_modulation[-1].weight, 0) # initally set weights of linear layer in AdaLN module to 0,
+        # so that it doesnt contribute to activations in atypical initial setting
 
-        for block in self.patch_mixer:
-            nn.init.constant_(block.AdaLN_modulation[-1].weight, 0)
+        # cross attention kv projections hoisted out of the blocks, same init as CrossAttention.custom_init
+        nn.init.trunc_normal_(self.backbone_cx_attn_kv.weight, mean=0.0, std=0.02)
+        if self.use_patch_mixer:
+            nn.init.trunc_normal_(self.patch_mixer_cx_attn_kv.weight, mean=0.0, std=0.02)
         
         self.caption_embedding_attention.custom_init()
         # set contribution of these projection layers to be 0 initially
@@ -1,7 +1,6 @@
 from typing import Any, Optional, Union, Tuple
 from collections.abc import Iterable
 from itertools import repeat
-import numpy as np
 
 import torch
 import torch.nn as nn
@@ -75,7 +74,9 @@ class CrossAttention (nn.Module):
     # B T C text k v
     # B T X image q
     # channels have to be same for q @ k
-    def __init__(self, n_embd, n_head, n_hidden=None, norm_eps=1e-6, qkv_bias=True):
+    # project_kv=False leaves out the kv projection, caller then passes precomputed kv (B, T, 2C') to forward
+    # (DiT projects caption once for all its blocks)
+    def __init__(self, n_embd, n_head, n_hidden=None, norm_eps=1e-6, qkv_bias=True, project_kv:bool=True):
         super().__init__()
         self.n_embd = n_embd
         self.n_head = n_head
@@ -91,21 +92,23 @@ class CrossAttention (nn.Module):
         
         # query from image
         self.cx_attn_q = nn.Linear (n_embd, n_hidden, bias=qkv_bias)
-        self.cx_attn_kv = nn.Linear (n_embd, 2*n_hidden, bias=qkv_bias)
+        self.cx_attn_kv = nn.Linear (n_embd, 2*n_hidden, bias=qkv_bias) if project_kv else None
 
         self.proj = nn.Linear (n_hidden, n_embd, bias=qkv_bias)
         self.proj.NANO_GPT_SCALE_INIT = 1
     
-    def forward (self, x, condition):
+    def forward (self, x, condition=None, kv=None):
         # shapes from image
         B, T, C = x.shape
-        # shapes from text
-        T_B, T_T, T_C = condition.shape
 
-        assert C == T_C, f"channels mismatch in cross attention"
+        if kv is None:
+            assert self.cx_attn_kv is not None, f"CrossAttention built with project_kv=False needs precomputed kv in forward"
+            assert C == condition.shape[-1], f"channels mismatch in cross attention"
+            # kv from text
+            kv = self.cx_attn_kv (condition) # (B, T, 2C') C' = n_hidden
+        # shapes from text
+        T_B, T_T, _ = kv.shape
 
-        # kv from text
-        kv = self.cx_attn_kv (condition) # (B, T, 2C') C' = n_hidden
         # q from image x
         q = self.cx_attn_q (x) # (B, T, C')
 
@@ -130,7 +133,8 @@ class CrossAttention (nn.Module):
     
     def custom_init(self, init_std: float)-> None:
         for linear in (self.cx_attn_q, self.cx_attn_kv):
-            nn.init.trunc_normal_(linear.weight, mean=0.0, std=0.02)
+            if linear is not None:
+                nn.init.trunc_normal_(linear.weight, mean=0.0, std=0.02)
         nn.init.trunc_normal_(self.proj.weight, mean=0.0, std=init_std)
 
 
@@ -182,7 +186,7 @@ class T2IFinalLayer (nn.Module):
         # get scale and shift from adaLN depending on current timestep
         shift, scale = self.adaLN_modulation (time_embd).split(self.n_embd, dim=-1)
         # normalize then modulate x with respect to current time step
-        x = modulate (self.norm_final(x), shift=shift, scale=scale)
+        x = modulated_layernorm (x, self.norm_final, shift=shift, scale=scale)
         x = self.linear(x)
         return x
 
@@ -254,10 +258,12 @@ def get_2d_sincos_pos_embed (
         grid_size:Union[int, Tuple[int, int]], 
         base_size:int=16, 
         cls_token :bool = False, extra_tokens:int=0,
-        pos_interp_scale = 1.0
-    ):
+        pos_interp_scale = 1.0,
+        device:Optional[torch.device] = None
+    ) -> torch.Tensor:
         """ One spot / pixel in grid is represented by n_embd channels, n_embd/2 come from scaled x
             coordinate, n_embd/2 come from scaled y co-ordinate
+            torch native so that it can be built directly on the device / in the dtype it is consumed in
         """
         if isinstance(grid_size, int):
             grid_size = ntuple (2, grid_size)
@@ -268,21 +274,21 @@ def get_2d_sincos_pos_embed (
         # division by grid_size[0] makes pos embeddings for different resolutions the same at specific spots
         # further division by (base_size / pos_interp_scale) mutates the range (say 0 to 16 instead of 0 to 1)
         # so that model can distinguish better
-        grid_h = np.arange (grid_size[0], dtype=np.float32) / (grid_size[0] / base_size) / pos_interp_scale
-        grid_w = np.arange (grid_size[1], dtype=np.float32) / (grid_size[1] / base_size) / pos_interp_scale
+        grid_h = torch.arange (grid_size[0], dtype=torch.float32, device=device) / (grid_size[0] / base_size) / pos_interp_scale
+        grid_w = torch.arange (grid_size[1], dtype=torch.float32, device=device) / (grid_size[1] / base_size) / pos_interp_scale
 
         # width, height
-        grid = np.meshgrid (grid_w, grid_h)
+        grid = torch.meshgrid (grid_w, grid_h, indexing='xy')
 
         # stack along axis 0 to get two matrices, first for width co-ordinates second for height co-ordinates
 
-        grid = np.stack (grid, axis=0) # (2, grid_size[1], grid_size[0]) (2, W, H)
+        grid = torch.stack (grid, dim=0) # (2, grid_size[1], grid_size[0]) (2, W, H)
         # make (2,1,W,H)
         grid = grid.reshape (2, 1, grid_size[1], grid_size[0]) # add spurious dimension to be processed by get_embedding function
 
         pos_embedding = get_2d_sinusoidal_embedding_from_grid (n_embd, grid)
         if cls_token and extra_tokens > 0:
-            pos_embedding = np.concatenate ([np.zeros([extra_tokens, n_embd]), pos_embedding], axis=0)
+            pos_embedding = torch.cat ([pos_embedding.new_zeros(extra_tokens, n_embd), pos_embedding], dim=0)
         
         return pos_embedding # (HW, n_embd)
 
@@ -296,29 +302,26 @@ def get_2d_sinusoidal_embedding_from_grid (n_embd, grid):
     embd_h = get_1d_sinusoidal_embedding(half_embd, grid[0]) # (HW, half_embd)
     # send y co-ordinates (y) (1, W, H) 
     embd_w = get_1d_sinusoidal_embedding(half_embd, grid[1]) # (HW, half_embd)
-    positional_embedding = np.concatenate([embd_h, embd_w], axis = 1) # (HW, n_embd)
+    positional_embedding = torch.cat([embd_h, embd_w], dim = 1) # (HW, n_embd)
     return positional_embedding 
 
 def get_1d_sinusoidal_embedding (n_embd, pos):
     """1D sinusoidal embeddings from grid"""
     assert n_embd % 2 == 0
 
-    omega = np.arange(n_embd//2, dtype=np.float64) # (D/2)
+    omega = torch.arange(n_embd//2, dtype=torch.float64, device=pos.device) # (D/2)
     omega = omega / (n_embd//2)
 
     # omega is linearly spaced, to generate exponentially decaying freqs
     # exponentiate omge to a number thats smaller than 1
     freqs = (1/10000) ** omega # (D/2)
-    pos = pos.reshape(-1) # (M)
+    pos = pos.reshape(-1).double() # (M)
     # now inject position into these frequencies
-    # first way: if they are tensors
-    # pos.unsqueeze(1) * freqs
-    # second way
-    mutated_freqs = np.einsum('m,d->md', pos, freqs) # (HW=M, D/2)
+    mutated_freqs = pos.unsqueeze(1) * freqs # (HW=M, D/2)
 
-    sin_embd = np.sin(mutated_freqs)
-    cos_embd = np.cos(mutated_freqs)
-    return np.concatenate ([sin_embd, cos_embd], axis=1)
+    sin_embd = torch.sin(mutated_freqs)
+    cos_embd = torch.cos(mutated_freqs)
+    return torch.cat ([sin_embd, cos_embd], dim=1).float()
 
 def get_mask (batch, length, mask_ratio, device):
     # calculate fraction thats not meant to be masked
@@ -421,3 +424,16 @@ def modulate (x: torch.Tensor, shift: torch.Tensor, scale: torch.Tensor) -> torc
 
     # add 1 to scale so that during intial stages, if scale is 0 it doesnt completely eliminate x
     return x * (1 + scale.unsqueeze(1)) + shift.unsqueeze(1)
+
+
+def modulated_layernorm (x: torch.Tensor, norm: nn.Module, shift: torch.Tensor, scale: torch.Tensor) -> torch.Tensor:
+    """Layer normalize then scale and shift the input tensor, equivalent to modulate(norm(x), shift, scale)
+    norm applies its affine in the same kernel, modulation is then a single addcmul over (B, T, C),
+    two passes (norm, addcmul) instead of three (norm, mul, add).
+    norm is called as a module so that its own precision rules apply (eg: composer LPLayerNorm runs in amp dtype)
+    """
+    # X (B, T, C)
+    # scale (B,C)
+    # shift (B,C)
+    # add 1 to scale on (B, C) only, so that during intial stages, if scale is 0 it doesnt completely eliminate x
+    return torch.addcmul (shift.unsqueeze(1), norm(x), (1 + scale).unsqueeze(1)) # (B, [1], C) + (B, T, C) * (B, [1], C)
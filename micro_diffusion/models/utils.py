@@ -182,6 +182,36 @@ def _cast_if_autocast_enabled(tensor: torch.Tensor) -> torch.Tensor:
         return tensor.to(dtype=dtype)
     return tensor
 
+# fan_in/fan_out projections of attention and feed forward layers in DiT blocks
+# MoE router gate and AdaLN projections are too small to benefit and are precision sensitive, they stay in amp dtype
+FLOAT8_LINEAR_NAMES = ('attn', 'proj', 'cx_attn_q', 'w_gate_up', 'fc3')
+DIT_BLOCK_PREFIXES = ('patch_mixer.', 'backbone.', 'patch_demixer.')
+# cross attention kv projections of DiT blocks, hoisted into DiT and stacked across blocks
+FLOAT8_STACKED_LINEAR_NAMES = ('patch_mixer_cx_attn_kv', 'backbone_cx_attn_kv')
+
+def apply_float8_linear(dit: nn.Module) -> nn.Module:
+    """Swap the large nn.Linear layers in DiT blocks for torchao Float8Linear (dynamic fp8 activations and weights).
+    Norms, softmax and modulation keep running in amp precision. Requires torchao and sm_89+ GPUs.
+
+    Args:
+        dit (nn.Module): DiT model, modified in place
+    """
+    try:
+        from torchao.float8 import convert_to_float8_training
+    except ImportError as e:
+        raise ImportError('float8_linear algorithm requires torchao, install it with `pip install torchao`') from e
+
+    def module_filter_fn(module: nn.Module, fqn: str) -> bool:
+        if not isinstance(module, nn.Linear):
+            return False
+        is_block_linear = fqn.startswith(DIT_BLOCK_PREFIXES) and fqn.split('.')[-1] in FLOAT8_LINEAR_NAMES
+        if not (is_block_linear or fqn in FLOAT8_STACKED_LINEAR_NAMES):
+            return False
+        # fp8 GEMMs need both dims to be multiples of 16
+        return module.in_features % 16 == 0 and module.out_features % 16 == 0
+
+    return convert_to_float8_training(dit, module_filter_fn=module_filter_fn)
+
 class DistLoss (Metric):
     """ Distributed loss Metric.
      Args:
@@ -0,0 +1,82 @@
+"""Graph capture smoke tests: DiT blocks have to compile with fullgraph=True, so that inductor can fuse across them
+(misc.compile in train.py). A graph break or an attribute typo (eg: unqueeze) fails these tests."""
+import pytest
+import torch
+
+from micro_diffusion.models.dit import DiT, DiTBlock
+
+N_EMBD = 64
+HEAD_SIZE = 32
+
+
+@pytest.fixture(autouse=True)
+def reset_dynamo():
+    torch._dynamo.reset()
+    yield
+    torch._dynamo.reset()
+
+
+def make_block(is_moe: bool) -> DiTBlock:
+    block = DiTBlock(
+        n_embd=N_EMBD,
+        head_size=HEAD_SIZE,
+        mlp_n_hidden_mult=4.0,
+        qkv_n_hidden_mult=1.0,
+        hidden_base_mult=16,
+        norm_eps=1e-6,
+        depth_init=True,
+        block_index=0,
+        num_blocks_for_weight_init=2,
+        scale_cx_attn_n_hidden=False,
+        use_bias=False,
+        is_moe=is_moe,
+        num_experts=4,
+        expert_capacity=1.0
+    )
+    block.custom_init()
+    return block
+
+
+@pytest.mark.parametrize("is_moe", [False, True], ids=["dense", "moe"])
+def test_dit_block_fullgraph(is_moe):
+    block = make_block(is_moe)
+    B, T, L = 2, 16, 8
+    x = torch.randn(B, T, N_EMBD, requires_grad=True)
+    kv = torch.randn(B, L, 2 * block.cx_attn.n_hidden)
+    modulation = torch.randn(B, 6 * N_EMBD)
+
+    compiled = torch.compile(block, fullgraph=True, backend="aot_eager")
+    out = compiled(x, kv, modulation)
+    assert out.shape == (B, T, N_EMBD)
+    torch.testing.assert_close(out, block(x, kv, modulation))
+
+    out.sum().backward()
+    assert x.grad is not None
+
+
+def test_dit_fullgraph():
+    dit = DiT(
+        input_res=8,
+        patch_size=2,
+        in_channels=4,
+        n_embd=N_EMBD,
+        depth=2,
+        head_size=HEAD_SIZE,
+        n_hidden_base_mult=16,
+        caption_n_embd=32,
+        patch_mixer_depth=2,
+        patch_mixer_dim=N_EMBD,
+        use_bias=False,
+        num_experts=4,
+        expert_capacity=1.0,
+    )
+    B, L = 2, 8
+    x = torch.randn(B, 4, 8, 8)
+    sigma_t = torch.rand(B)
+    c = torch.randn(B, 1, L, 32)
+
+    compiled = torch.compile(dit, fullgraph=True, backend="aot_eager")
+    out = compiled(x, sigma_t, c)["sample"]
+    assert out.shape == x.shape
+
+    out.sum().backward()